@@ -9,15 +9,36 @@ Key DuckDB extension patterns used:
   CREATE SECRET … (TYPE snowflake)
   snowflake_query(sql, secret_name)   – passthrough query
   ATTACH '' AS db (TYPE snowflake, SECRET …, READ_ONLY)
+
+Data handling conventions:
+  Results stay as pyarrow.Table.  Read values column-wise – Array.to_pylist(),
+  Table.to_pylist() per record batch.  Where a pandas DataFrame is unavoidable,
+  iterate with df.itertuples(index=False, name=None).  Row-wise iterrows is
+  never used (CI greps for it).
 """
 
 import streamlit as st
 import duckdb
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import collections
+import contextlib
+import datetime
+import functools
 import time
 import io
+import json
+import math
 import os
 import traceback
+import uuid
+
+try:
+    import orjson  # optional – much faster JSON export
+except ImportError:
+    orjson = None
 
 # ── Page config ──────────────────────────────────────────────────────────────
 
@@ -76,15 +97,18 @@ _DEFAULTS: dict = {
     "connected": False,
     "secret_name": "",
     "attach_alias": "",
+    "catalog_key": "",
     "conn_string_preview": "",
-    "query_history": [],
+    "query_history": collections.deque(maxlen=50),
     "current_db": None,
     "current_schema": None,
     "current_table": None,
     "last_result": None,
     "last_query": "",
+    "last_result_key": "",
     "last_elapsed": 0.0,
     "last_row_count": 0,
+    "local_run": None,
     "duckdb_conn": None,
     "extension_loaded": False,
 }
@@ -95,10 +119,27 @@ for _k, _v in _DEFAULTS.items():
 
 # ── DuckDB connection management ────────────────────────────────────────────
 
+# Sized for small containers by default; override per deployment via env vars
+_DUCKDB_THREADS = int(os.environ.get("DUCKDB_THREADS") or min(8, os.cpu_count() or 4))
+_DUCKDB_MEMORY_LIMIT = os.environ.get("DUCKDB_MEMORY_LIMIT", "2GB")
+
+
+def _configure_duckdb(conn: duckdb.DuckDBPyConnection) -> None:
+    """Apply thread / memory PRAGMAs to a fresh connection."""
+    conn.execute(f"PRAGMA threads={_DUCKDB_THREADS};")
+    memory_limit = _DUCKDB_MEMORY_LIMIT.replace("'", "''")
+    conn.execute(f"PRAGMA memory_limit='{memory_limit}';")
+    try:
+        conn.execute("PRAGMA enable_object_cache;")
+    except Exception:
+        pass  # not available in every DuckDB release
+
+
 def _get_duckdb() -> duckdb.DuckDBPyConnection:
     """Return (and cache) a persistent in-process DuckDB connection."""
     if st.session_state.duckdb_conn is None:
         conn = duckdb.connect(database=":memory:")
+        _configure_duckdb(conn)
         st.session_state.duckdb_conn = conn
     return st.session_state.duckdb_conn
 
@@ -145,28 +186,27 @@ def _create_secret(
 
     parts = [
         f"TYPE snowflake",
-        f"ACCOUNT '{account}'",
-        f"USER '{user}'",
+        f"ACCOUNT {_sql_literal(account)}",
+        f"USER {_sql_literal(user)}",
     ]
 
     if auth_method == "Password":
-        parts.append(f"PASSWORD '{password}'")
+        parts.append(f"PASSWORD {_sql_literal(password)}")
     elif auth_method == "Key Pair":
         parts.append("AUTH_TYPE 'key_pair'")
-        # Escape single quotes in PEM
-        parts.append(f"PRIVATE_KEY '{private_key_pem}'")
+        parts.append(f"PRIVATE_KEY {_sql_literal(private_key_pem)}")
         if private_key_passphrase:
-            parts.append(f"PRIVATE_KEY_PASSPHRASE '{private_key_passphrase}'")
+            parts.append(f"PRIVATE_KEY_PASSPHRASE {_sql_literal(private_key_passphrase)}")
     elif auth_method == "OAuth Token":
         parts.append("AUTH_TYPE 'oauth'")
-        parts.append(f"TOKEN '{oauth_token}'")
+        parts.append(f"TOKEN {_sql_literal(oauth_token)}")
 
     if database:
-        parts.append(f"DATABASE '{database}'")
+        parts.append(f"DATABASE {_sql_literal(database)}")
     if warehouse:
-        parts.append(f"WAREHOUSE '{warehouse}'")
+        parts.append(f"WAREHOUSE {_sql_literal(warehouse)}")
     if role:
-        parts.append(f"ROLE '{role}'")
+        parts.append(f"ROLE {_sql_literal(role)}")
 
     sql = f"CREATE SECRET {secret_name} ({', '.join(parts)});"
     try:
@@ -179,35 +219,90 @@ def _create_secret(
 def _test_connection_via_duckdb(conn: duckdb.DuckDBPyConnection, secret_name: str) -> tuple[bool, str]:
     """Run a trivial query through snowflake_query() to verify connectivity."""
     try:
-        df = conn.execute(
-            f"SELECT * FROM snowflake_query('SELECT CURRENT_VERSION() AS V, CURRENT_ACCOUNT() AS A, "
-            f"CURRENT_USER() AS U, CURRENT_ROLE() AS R', '{secret_name}');"
-        ).fetchdf()
-        row = df.iloc[0]
+        tbl = conn.execute(
+            "SELECT * FROM snowflake_query(?, ?);",
+            ["SELECT CURRENT_VERSION() AS V, CURRENT_ACCOUNT() AS A, CURRENT_USER() AS U, CURRENT_ROLE() AS R",
+             secret_name],
+        ).fetch_arrow_table()
+        row = tbl.slice(0, 1).to_pylist()[0]
         info = f"Snowflake v{row['V']}  •  Account: {row['A']}  •  User: {row['U']}  •  Role: {row['R']}"
         return True, info
     except Exception as exc:
         return False, str(exc)
 
 
-def _run_query_duckdb(conn: duckdb.DuckDBPyConnection, sql: str) -> tuple[pd.DataFrame | None, float, str]:
-    """Execute *sql* in DuckDB and return (df, elapsed, error)."""
+def _attach_snowflake(conn: duckdb.DuckDBPyConnection, secret_name: str, alias: str = "sf_db") -> tuple[bool, str]:
+    """ATTACH the secret's default database read-only as *alias*.  Returns (ok, msg)."""
     try:
-        t0 = time.perf_counter()
-        result = conn.execute(sql)
-        df = result.fetchdf()
-        elapsed = time.perf_counter() - t0
-        return df, elapsed, ""
+        conn.execute(f"DETACH DATABASE IF EXISTS {alias};")
+        conn.execute(
+            f"ATTACH '' AS {alias} (TYPE snowflake, SECRET {secret_name}, READ_ONLY, ENABLE_PUSHDOWN true);"
+        )
+        return True, f"Attached as {alias}"
+    except Exception as exc:
+        return False, str(exc)
+
+
+def _quote_ident(name: str) -> str:
+    """Double-quote an identifier for DuckDB / Snowflake SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_literal(value: str) -> str:
+    """Single-quote a string literal, for statements that can't take parameters (CREATE SECRET)."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+@contextlib.contextmanager
+def _timed():
+    """Time a block: ``with _timed() as elapsed: …`` then ``elapsed()`` gives its seconds."""
+    t0 = time.perf_counter()
+    t1 = t0
+    try:
+        yield lambda: t1 - t0
+    finally:
+        t1 = time.perf_counter()
+
+
+def _run_query_duckdb(
+    conn: duckdb.DuckDBPyConnection, sql: str, params: list | None = None
+) -> tuple[pa.Table | None, float, str]:
+    """Execute *sql* (with optional bound *params*) in DuckDB and return (arrow_table, elapsed, error)."""
+    try:
+        with _timed() as elapsed:
+            result = conn.execute(sql, params) if params else conn.execute(sql)
+            # Statements without a result set (SET, some PRAGMAs, …) have nothing to fetch
+            tbl = result.fetch_arrow_table() if result.description is not None else pa.table({})
+        return tbl, elapsed(), ""
     except Exception as exc:
         return None, 0.0, str(exc)
 
 
-def _snowflake_query(conn: duckdb.DuckDBPyConnection, sf_sql: str, secret: str) -> tuple[pd.DataFrame | None, float, str]:
+# Results below these limits are re-chunked; larger ones are left alone to avoid the copy
+_REBATCH_MAX_ROWS = 5_000_000
+_REBATCH_MAX_BYTES = 512 * 1024 * 1024
+_REBATCH_CHUNK_ROWS = 100_000
+
+
+def _rebatch(tbl: pa.Table) -> pa.Table:
+    """Merge the many small ADBC record batches into ~100k-row batches.
+
+    DuckDB pays a per-batch overhead when scanning Arrow data, so a handful of
+    large batches aggregates much faster than one batch per Snowflake chunk.
+    """
+    if tbl.num_rows >= _REBATCH_MAX_ROWS or tbl.nbytes >= _REBATCH_MAX_BYTES:
+        return tbl
+    combined = tbl.combine_chunks()
+    return pa.Table.from_batches(combined.to_batches(max_chunksize=_REBATCH_CHUNK_ROWS), schema=combined.schema)
+
+
+def _snowflake_query(conn: duckdb.DuckDBPyConnection, sf_sql: str, secret: str) -> tuple[pa.Table | None, float, str]:
     """Execute a passthrough Snowflake SQL via snowflake_query()."""
-    # Escape single quotes in the user SQL for embedding
-    escaped = sf_sql.replace("'", "''")
-    wrapper = f"SELECT * FROM snowflake_query('{escaped}', '{secret}');"
-    return _run_query_duckdb(conn, wrapper)
+    # Bound parameters: no quote escaping, and DuckDB sees the same statement text every call
+    tbl, elapsed, err = _run_query_duckdb(conn, "SELECT * FROM snowflake_query(?, ?);", [sf_sql, secret])
+    if tbl is not None:
+        tbl = _rebatch(tbl)
+    return tbl, elapsed, err
 
 
 def _sf_fetch_list(conn: duckdb.DuckDBPyConnection, sf_sql: str, secret: str, col: str | int = 0) -> list[str]:
@@ -216,20 +311,370 @@ def _sf_fetch_list(conn: duckdb.DuckDBPyConnection, sf_sql: str, secret: str, co
     *col* can be a column name (str) or positional index (int).
     For SHOW commands the interesting column is usually called 'name'.
     """
-    df, _, err = _snowflake_query(conn, sf_sql, secret)
-    if df is not None and not df.empty:
+    tbl, _, err = _snowflake_query(conn, sf_sql, secret)
+    if tbl is not None and tbl.num_rows:
         if isinstance(col, str):
             # case-insensitive column lookup
-            col_lower = col.lower()
-            for c in df.columns:
-                if c.lower() == col_lower:
-                    return df[c].dropna().astype(str).tolist()
+            real = {c.lower(): c for c in tbl.column_names}.get(col.lower())
+            if real is not None:
+                return pc.cast(tbl.column(real).drop_null(), pa.string()).to_pylist()
             # fallback: first column
-            return df.iloc[:, 0].astype(str).tolist()
-        return df.iloc[:, col].astype(str).tolist()
+            col = 0
+        return pc.cast(tbl.column(col), pa.string()).to_pylist()
     return []
 
 
+# ── Cached metadata lookups ──────────────────────────────────────────────────
+# Only plain results are cached – never the DuckDBPyConnection itself, which is
+# not hashable / picklable.  The connection is looked up inside each helper.
+
+_CATALOG_TTL = 3600  # seconds
+
+
+@st.cache_resource(ttl=_CATALOG_TTL, show_spinner=False)
+def _catalog_cache(identity: str) -> dict:
+    """Server-wide catalog for one Snowflake identity (account / user / role).
+
+    Shared by every session connected as that identity, so the database list
+    and per-database catalogs are fetched once per server, not once per session.
+    "columns" holds per-schema column rows for databases listed in "partial";
+    "row_counts" holds exact COUNT(*) results fetched on request.
+    """
+    return {"dbs": None, "catalogs": {}, "partial": set(), "columns": {}, "row_counts": {}}
+
+
+def _catalog_databases(identity: str, secret: str) -> list[str]:
+    """SHOW DATABASES, served from the shared catalog after the first call."""
+    cache = _catalog_cache(identity)
+    if cache["dbs"] is None:
+        dbs = _sf_fetch_list(_get_duckdb(), "SHOW DATABASES", secret, col="name")
+        if not dbs:
+            return dbs  # don't cache a failed / empty lookup
+        cache["dbs"] = dbs
+    return cache["dbs"]
+
+
+def _catalog_for_db(identity: str, db: str, secret: str) -> tuple[pa.Table | None, str]:
+    """Batched schema / table / column catalog of *db*, from the shared catalog.
+
+    Snowflake rejects an unfiltered INFORMATION_SCHEMA.COLUMNS scan on large
+    databases ("Information schema query returned too much data").  Then the
+    catalog is fetched without columns, and _columns_for_schema() loads them
+    one schema at a time.
+    """
+    cache = _catalog_cache(identity)
+    if db not in cache["catalogs"]:
+        tbl, err = _fetch_db_catalog(db, secret)
+        if tbl is None:
+            tbl, _ = _fetch_db_catalog(db, secret, with_columns=False)
+            if tbl is None:
+                return None, err
+            cache["partial"].add(db)
+        cache["catalogs"][db] = tbl
+    return cache["catalogs"][db], ""
+
+
+def _columns_for_schema(identity: str, db: str, schema: str, secret: str) -> tuple[pa.Table | None, str]:
+    """Catalog holding the 'columns' rows of *schema* – the database catalog unless it is partial."""
+    cache = _catalog_cache(identity)
+    if db not in cache["partial"]:
+        return cache["catalogs"].get(db), ""
+    if (db, schema) not in cache["columns"]:
+        tbl, _, err = _snowflake_query(_get_duckdb(), _catalog_columns_sql(db, schema), secret)
+        if tbl is None:
+            return None, err
+        cache["columns"][(db, schema)] = tbl
+    return cache["columns"][(db, schema)], ""
+
+
+def _catalog_columns_sql(db: str, schema: str | None = None) -> str:
+    """'columns' rows of the batched catalog, optionally for one schema only."""
+    sql = (
+        f"SELECT 'columns' AS KIND, TABLE_SCHEMA AS SCHEMA_NAME, TABLE_NAME, COLUMN_NAME, DATA_TYPE, "
+        f"IS_NULLABLE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE, COLUMN_DEFAULT, "
+        f"ORDINAL_POSITION, NULL AS ROW_COUNT, NULL AS BYTES "
+        f"FROM {_quote_ident(db)}.INFORMATION_SCHEMA.COLUMNS"
+    )
+    if schema is not None:
+        sql += f" WHERE TABLE_SCHEMA = {_sql_literal(schema)}"
+    return sql
+
+
+def _fetch_db_catalog(db: str, secret: str, with_columns: bool = True) -> tuple[pa.Table | None, str]:
+    """Schemas, tables and columns of *db* in ONE snowflake_query() round-trip.
+
+    Rows are tagged with a KIND discriminator ('schemas' / 'tables' /
+    'columns') and split locally in DuckDB by _catalog_select().  'tables'
+    rows carry Snowflake's metadata ROW_COUNT / BYTES, so no COUNT(*) is needed.
+    Returns (table, error).
+    """
+    info = f"{_quote_ident(db)}.INFORMATION_SCHEMA"
+    catalog_sql = (
+        f"SELECT 'schemas' AS KIND, SCHEMA_NAME, NULL AS TABLE_NAME, NULL AS COLUMN_NAME, "
+        f"NULL AS DATA_TYPE, NULL AS IS_NULLABLE, NULL AS CHARACTER_MAXIMUM_LENGTH, "
+        f"NULL AS NUMERIC_PRECISION, NULL AS NUMERIC_SCALE, NULL AS COLUMN_DEFAULT, "
+        f"NULL AS ORDINAL_POSITION, NULL AS ROW_COUNT, NULL AS BYTES "
+        f"FROM {info}.SCHEMATA "
+        f"UNION ALL "
+        f"SELECT 'tables', TABLE_SCHEMA, TABLE_NAME, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, "
+        f"ROW_COUNT, BYTES "
+        f"FROM {info}.TABLES"
+    )
+    if with_columns:
+        catalog_sql += f" UNION ALL {_catalog_columns_sql(db)}"
+    tbl, _, err = _snowflake_query(_get_duckdb(), catalog_sql, secret)
+    return tbl, err
+
+
+def _catalog_select(catalog: pa.Table, sql: str, params: list | None = None) -> pa.Table:
+    """Run *sql* in DuckDB against *catalog*, exposed as the view `_sf_catalog`."""
+    conn = _get_duckdb()
+    conn.register("_sf_catalog", catalog)
+    try:
+        return conn.execute(sql, params or []).fetch_arrow_table()
+    finally:
+        conn.unregister("_sf_catalog")
+
+
+def _cached_row_count(identity: str, db: str, schema: str, table: str, secret: str) -> int | None:
+    """Exact COUNT(*) for one table, or None if it could not be retrieved.
+
+    Runs a warehouse query, so it is only used on request for tables whose
+    metadata has no ROW_COUNT (views, external / Iceberg tables).  Kept in the
+    shared catalog of *identity*, so counts are never shown to another role.
+    """
+    cache = _catalog_cache(identity)
+    key = (db, schema, table)
+    if key not in cache["row_counts"]:
+        cnt_sql = f"SELECT COUNT(*) AS ROW_COUNT FROM {_quote_ident(db)}.{_quote_ident(schema)}.{_quote_ident(table)}"
+        tbl, _, _ = _snowflake_query(_get_duckdb(), cnt_sql, secret)
+        if tbl is None or not tbl.num_rows:
+            return None
+        cache["row_counts"][key] = int(tbl.column(0)[0].as_py())
+    return cache["row_counts"][key]
+
+
+def _clear_metadata_cache(identity: str) -> None:
+    """Invalidate the shared catalog of *identity*, including its row counts."""
+    _catalog_cache(identity).update(dbs=None, catalogs={}, partial=set(), columns={}, row_counts={})
+
+
+# ── Export helpers ───────────────────────────────────────────────────────────
+# Results stay as pyarrow.Table end-to-end; these write straight from Arrow
+# without a pandas round-trip.  The serialized bytes are cached per result so
+# download buttons don't re-encode on every rerun.  *result_key* identifies the
+# result; the leading underscore keeps Streamlit from hashing the table itself.
+
+_EXPORT_CACHE_ENTRIES = 8
+
+# Rows sent to the browser per st.dataframe render; exports still use the full result
+_PAGE_SIZE = 200
+
+
+def _page_input(tbl: pa.Table, key: str) -> int:
+    """Page selector for *tbl*.  Reset by setting ``st.session_state[key] = 1``."""
+    n_pages = max(1, -(-tbl.num_rows // _PAGE_SIZE))
+    return st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=key)
+
+
+def _show_page(tbl: pa.Table, page: int, pandas_view: bool, height: int) -> None:
+    """Render one page of *tbl* – only the visible rows are shipped to the browser (slice is zero-copy)."""
+    n_pages = max(1, -(-tbl.num_rows // _PAGE_SIZE))
+    page_tbl = tbl.slice((page - 1) * _PAGE_SIZE, _PAGE_SIZE)
+    st.caption(
+        f"Rows {(page - 1) * _PAGE_SIZE + 1:,}–{(page - 1) * _PAGE_SIZE + page_tbl.num_rows:,} "
+        f"of {tbl.num_rows:,}  •  page {page} / {n_pages}"
+    )
+    st.dataframe(page_tbl.to_pandas() if pandas_view else page_tbl,
+                 use_container_width=True, hide_index=True, height=height)
+
+
+def _csv_safe(tbl: pa.Table) -> pa.Table:
+    """Render LIST / STRUCT / MAP columns as text – Arrow's CSV writer rejects nested types."""
+    for i, field in enumerate(tbl.schema):
+        if pa.types.is_nested(field.type):
+            text = pa.array(
+                [None if v is None else str(v) for v in tbl.column(i).to_pylist()], type=pa.string()
+            )
+            tbl = tbl.set_column(i, field.name, text)
+    return tbl
+
+
+@st.cache_data(max_entries=_EXPORT_CACHE_ENTRIES, show_spinner=False)
+def _csv_bytes(result_key: str, _tbl: pa.Table) -> bytes:
+    """Serialize *_tbl* to CSV using Arrow's native writer."""
+    buf = io.BytesIO()
+    pa_csv.write_csv(_csv_safe(_tbl), buf)
+    return buf.getvalue()
+
+
+def _json_default(value) -> str:
+    """Values JSON has no type for: ISO-8601 for dates / times, str() for the rest (Decimal, …)."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_safe(value):
+    """NaN / ±inf become null and integers wider than 64 bits become strings, recursively."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 64:
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def _json_float(value: float) -> str:
+    """repr() reformatted the way orjson writes floats (1e16, 1e-7, 0.00001)."""
+    text = repr(value)
+    if "e" in text:
+        mantissa, exp = text.split("e")
+        if int(exp) == -5:
+            sign = "-" if mantissa.startswith("-") else ""
+            return f"{sign}0.0000{mantissa.lstrip('-').replace('.', '')}"
+        text = f"{mantissa}e{int(exp)}"
+    return text
+
+
+def _json_text(value) -> str:
+    """Compact JSON for a _json_safe() value – the stdlib twin of orjson's output."""
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float):
+        return _json_float(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, dict):
+        return "{" + ",".join(
+            f"{json.dumps(k, ensure_ascii=False)}:{_json_text(v)}" for k, v in value.items()
+        ) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_json_text(v) for v in value) + "]"
+    return _json_text(_json_default(value))
+
+
+def _dump_record(row: dict) -> bytes:
+    """Encode one record as compact JSON – the same bytes with or without orjson."""
+    if orjson is not None:
+        return orjson.dumps(row, default=_json_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return _json_text(row).encode("utf-8")
+
+
+def _json_needs_safe(dtype: pa.DataType) -> bool:
+    """Column types whose Python values may hold NaN or out-of-range integers."""
+    return not (
+        pa.types.is_string(dtype) or pa.types.is_large_string(dtype) or pa.types.is_boolean(dtype)
+        or pa.types.is_integer(dtype) or pa.types.is_temporal(dtype) or pa.types.is_decimal(dtype)
+        or pa.types.is_binary(dtype) or pa.types.is_large_binary(dtype)
+    )
+
+
+@st.cache_data(max_entries=_EXPORT_CACHE_ENTRIES, show_spinner=False)
+def _json_bytes(result_key: str, _tbl: pa.Table) -> bytes:
+    """Serialize *_tbl* to a compact JSON array of records, one record batch at a time."""
+    unsafe = [f.name for f in _tbl.schema if _json_needs_safe(f.type)]
+
+    def records():
+        for batch in _tbl.to_batches():
+            for row in batch.to_pylist():
+                for name in unsafe:
+                    row[name] = _json_safe(row[name])
+                yield _dump_record(row)
+
+    return b"[" + b",".join(records()) + b"]"
+
+
+@st.cache_data(max_entries=_EXPORT_CACHE_ENTRIES, show_spinner=False)
+def _parquet_bytes(result_key: str, _tbl: pa.Table) -> bytes:
+    """Serialize *_tbl* to Parquet via pyarrow.parquet.
+
+    zstd compresses better than the snappy default at similar speed, and
+    dictionary encoding suits the low-cardinality columns typical of
+    Snowflake results (status, region, type, …).
+    """
+    buf = io.BytesIO()
+    pq.write_table(_tbl, buf, compression="zstd", use_dictionary=True, data_page_size=1_048_576)
+    return buf.getvalue()
+
+
+# (label, serializer, file extension, MIME type)
+_EXPORT_FORMATS = (
+    ("CSV", _csv_bytes, "csv", "text/csv"),
+    ("JSON", _json_bytes, "json", "application/json"),
+    ("Parquet", _parquet_bytes, "parquet", "application/octet-stream"),
+)
+
+
+def _export_buttons(result_key: str, tbl: pa.Table, basename: str, key_prefix: str) -> None:
+    """CSV / JSON / Parquet download buttons for one result.
+
+    The data is a callable, so serialization only happens on click; a
+    serializer error is raised to Streamlit's download handler rather than
+    being written into the file.
+    """
+    cols = st.columns(len(_EXPORT_FORMATS))
+    for col, (label, serialize, ext, mime) in zip(cols, _EXPORT_FORMATS):
+        with col:
+            st.download_button(f"⬇️ {label}", functools.partial(serialize, result_key, tbl),
+                               f"{basename}.{ext}", mime, use_container_width=True,
+                               key=f"{key_prefix}_{label}")
+
+
+# ── Helper snippets ──────────────────────────────────────────────────────────
+# Built once per (selected table, secret) and reused on every rerun.  Plain
+# lru_cache: the tuples are returned as-is, without st.cache_data's copy.
+
+def _table_ref(db: str | None, schema: str | None, table: str | None) -> str:
+    """Fully-qualified Snowflake name of the table selected in the browser."""
+    if table:
+        return f"{_quote_ident(db)}.{_quote_ident(schema)}.{_quote_ident(table)}"
+    return '"DB"."SCHEMA"."TABLE"'
+
+
+@functools.lru_cache(maxsize=64)
+def _sf_helper_snippets(db: str | None, schema: str | None, table: str | None) -> tuple[tuple[str, str], ...]:
+    """(label, snippet) pairs for the Snowflake Query helper buttons."""
+    return (
+        ("SHOW WAREHOUSES", "SHOW WAREHOUSES"),
+        ("SHOW DATABASES", "SHOW DATABASES"),
+        ("Session Info", "SELECT CURRENT_USER() AS U, CURRENT_ROLE() AS R, "
+                         "CURRENT_WAREHOUSE() AS WH, CURRENT_DATABASE() AS DB, "
+                         "CURRENT_SCHEMA() AS SCHEMA"),
+        ("Table Sample", f"SELECT * FROM {_table_ref(db, schema, table)} LIMIT 100"),
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _local_helper_snippets(
+    db: str | None, schema: str | None, table: str | None, secret: str
+) -> tuple[tuple[str, str], ...]:
+    """(label, snippet) pairs for the DuckDB Local SQL helper buttons."""
+    return (
+        ("DuckDB Version", "SELECT version() AS duckdb_version"),
+        ("List Secrets", "SELECT name, type, provider FROM duckdb_secrets() WHERE type = 'snowflake'"),
+        ("Local Tables", "SHOW ALL TABLES"),
+        ("Snowflake Ext", "SELECT snowflake_version()"),
+        ("SF → Local", (
+            f"CREATE OR REPLACE TABLE sample_data AS\n"
+            f"SELECT * FROM snowflake_query(\n"
+            f"    {_sql_literal(f'SELECT * FROM {_table_ref(db, schema, table)} LIMIT 500')},\n"
+            f"    {_sql_literal(secret)}\n)"
+            if table
+            else "-- Select a table in Browser tab first"
+        )),
+    )
+
+
 # ── Sidebar ──────────────────────────────────────────────────────────────────
 
 with st.sidebar:
@@ -270,8 +715,17 @@ with st.sidebar:
         oauth_token = st.text_area("OAuth Access Token", height=68, placeholder="eyJhbGci…")
     elif auth_method == "Key Pair":
         key_file = st.file_uploader("Private Key File (.p8 / .pem)", type=["p8", "pem", "key"])
-        if key_file is not None:
-            private_key_pem = key_file.read().decode("utf-8", errors="replace")
+        # Only decode when the upload changes, not on every rerun.  file_id (when
+        # available) distinguishes re-uploads of same-named, same-sized keys.
+        fid = (getattr(key_file, "file_id", None), key_file.name, key_file.size) if key_file else None
+        if fid is None:
+            st.session_state.pop("_pem_fid", None)
+            st.session_state.pop("_pem_cached", None)
+        elif fid != st.session_state.get("_pem_fid"):
+            st.session_state["_pem_cached"] = key_file.getvalue().decode("utf-8", errors="replace")
+            st.session_state["_pem_fid"] = fid
+        if fid is not None:
+            private_key_pem = st.session_state["_pem_cached"]
         private_key_passphrase = st.text_input("Key Passphrase (optional)", type="password")
 
     st.divider()
@@ -315,7 +769,23 @@ with st.sidebar:
                         ok, info = _test_connection_via_duckdb(conn, secret_name)
                     if ok:
                         st.session_state.connected = True
+                        st.session_state.catalog_key = f"{account}|{user}|{role}".lower()
                         st.session_state.secret_name = secret_name
+                        # Drop an ATTACH from a previous connect – it is bound to the old credentials
+                        if st.session_state.attach_alias:
+                            try:
+                                conn.execute(f"DETACH DATABASE IF EXISTS {st.session_state.attach_alias};")
+                            except Exception:
+                                pass
+                        st.session_state.attach_alias = ""
+                        # ATTACH (for Local SQL) binds to the secret's DATABASE, so only with a default database
+                        if database:
+                            with st.spinner("Attaching Snowflake database…"):
+                                att_ok, att_msg = _attach_snowflake(conn, secret_name)
+                            if att_ok:
+                                st.session_state.attach_alias = "sf_db"
+                            else:
+                                st.warning(f"ATTACH failed, use snowflake_query() instead: {att_msg}")
                         # Build preview string
                         preview_parts = [f"account={account}", f"user={user}"]
                         if auth_method == "Password":
@@ -348,6 +818,10 @@ with st.sidebar:
                     st.session_state.duckdb_conn.execute(f"DETACH {st.session_state.attach_alias};")
                 except Exception:
                     pass
+            try:
+                st.session_state.duckdb_conn.close()
+            except Exception:
+                pass
         st.session_state.connected = False
         st.session_state.secret_name = ""
         st.session_state.attach_alias = ""
@@ -356,6 +830,7 @@ with st.sidebar:
         st.session_state.current_table = None
         st.session_state.extension_loaded = False
         st.session_state.duckdb_conn = None
+        st.session_state.catalog_key = ""
         st.info("Disconnected. DuckDB state reset.")
 
     # Connection-string preview
@@ -364,6 +839,18 @@ with st.sidebar:
             st.code(st.session_state.conn_string_preview, language="text")
             st.caption("CREATE SECRET … (TYPE snowflake) – stored in DuckDB memory only")
 
+    if st.session_state.duckdb_conn is not None:
+        with st.expander("⚙️ DuckDB Settings"):
+            try:
+                settings = st.session_state.duckdb_conn.execute(
+                    "SELECT name, value FROM duckdb_settings() "
+                    "WHERE name IN ('threads', 'memory_limit', 'enable_object_cache') ORDER BY name"
+                ).fetch_arrow_table()
+                st.dataframe(settings, use_container_width=True, hide_index=True)
+            except Exception as exc:
+                st.caption(str(exc))
+            st.caption("Override with DUCKDB_THREADS / DUCKDB_MEMORY_LIMIT")
+
 
 # ── Main area ────────────────────────────────────────────────────────────────
 
@@ -403,41 +890,89 @@ tab_browser, tab_query, tab_local, tab_history = st.tabs(
 # TAB 1 – Database / Schema / Table browser  (via snowflake_query)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_browser:
+@st.fragment
+def _preview_fragment(
+    conn: duckdb.DuckDBPyConnection,
+    secret: str,
+    selected_db: str,
+    selected_schema: str,
+    selected_table: str,
+) -> None:
+    """Data preview panel – reruns on its own when the row slider moves."""
+    st.markdown(
+        '<div class="table-header">🔍 Data Preview  (via DuckDB snowflake_query)</div>',
+        unsafe_allow_html=True,
+    )
+    preview_limit = st.slider("Preview rows", 10, 1000, 100, step=10, key="preview_limit")
+    sf_table = f"{_quote_ident(selected_db)}.{_quote_ident(selected_schema)}.{_quote_ident(selected_table)}"
+    preview_sf_sql = f"SELECT * FROM {sf_table} LIMIT {preview_limit}"
+    # Passthrough keeps the LIMIT on the Snowflake side – an ATTACHed scan
+    # fetches every row before DuckDB applies the LIMIT (see README "Limitations")
+
+    if st.button("🔄 Load Preview", key="load_preview"):
+        with st.spinner("Fetching via DuckDB → Arrow ADBC…"):
+            tbl, elapsed, err = _snowflake_query(conn, preview_sf_sql, secret)
+        if err:
+            st.error(err)
+        elif tbl is not None:
+            st.caption(f"{tbl.num_rows} rows  •  {elapsed:.2f}s  •  DuckDB compute")
+            st.dataframe(tbl, use_container_width=True, hide_index=True)
+
+    with st.expander("📋 DuckDB SQL for this table"):
+        passthrough = (
+            f"SELECT * FROM snowflake_query(\n"
+            f"    {_sql_literal(preview_sf_sql)},\n"
+            f"    {_sql_literal(secret)}\n);"
+        )
+        st.code(passthrough, language="sql")
+
+
+@st.fragment
+def _browser_fragment(conn: duckdb.DuckDBPyConnection, secret: str) -> None:
+    """Database / schema / table selectors and column metadata."""
     st.markdown("#### Browse Snowflake Databases  *(fetched via DuckDB → Arrow ADBC)*")
 
     # ── Databases ────────────────────────────────────────────────────────────
-    databases = _sf_fetch_list(conn, "SHOW DATABASES", secret, col="name")
+    identity = st.session_state.catalog_key
+    if st.button("🔄 Refresh catalog", key="refresh_meta",
+                 help="Re-fetch databases, schemas and tables from Snowflake"):
+        _clear_metadata_cache(identity)
+
+    databases = _catalog_databases(identity, secret)
     if not databases:
         st.warning("No databases found (check privileges or connection).")
-        st.stop()
+        return
 
     col_db, col_schema, col_table = st.columns(3)
 
     with col_db:
         selected_db = st.selectbox("Database", databases, key="sel_db")
 
-    # ── Schemas ──────────────────────────────────────────────────────────────
-    schemas: list[str] = []
+    # ── Schemas / tables / columns (one batched round-trip per database) ─────
+    catalog: pa.Table | None = None
     if selected_db:
-        schemas = _sf_fetch_list(
-            conn,
-            f"SELECT SCHEMA_NAME FROM \"{selected_db}\".INFORMATION_SCHEMA.SCHEMATA ORDER BY 1",
-            secret,
-        )
+        catalog, catalog_err = _catalog_for_db(identity, selected_db, secret)
+        if catalog is None:
+            st.error(f"Could not load the catalog of {selected_db}:\n\n{catalog_err}")
+
+    schemas: list[str] = []
+    if catalog is not None:
+        schemas = _catalog_select(
+            catalog,
+            "SELECT SCHEMA_NAME FROM _sf_catalog WHERE KIND = 'schemas' ORDER BY 1",
+        ).column(0).to_pylist()
 
     with col_schema:
         selected_schema = st.selectbox("Schema", schemas, key="sel_schema") if schemas else None
 
     # ── Tables ───────────────────────────────────────────────────────────────
     tables: list[str] = []
-    if selected_db and selected_schema:
-        tables = _sf_fetch_list(
-            conn,
-            f"SELECT TABLE_NAME FROM \"{selected_db}\".INFORMATION_SCHEMA.TABLES "
-            f"WHERE TABLE_SCHEMA = '{selected_schema}' ORDER BY 1",
-            secret,
-        )
+    if catalog is not None and selected_schema:
+        tables = _catalog_select(
+            catalog,
+            "SELECT TABLE_NAME FROM _sf_catalog WHERE KIND = 'tables' AND SCHEMA_NAME = ? ORDER BY 1",
+            [selected_schema],
+        ).column(0).to_pylist()
 
     with col_table:
         selected_table = st.selectbox("Table", tables, key="sel_table") if tables else None
@@ -456,60 +991,60 @@ with tab_browser:
                 f'<div class="table-header">📋 {selected_db}.{selected_schema}.{selected_table}</div>',
                 unsafe_allow_html=True,
             )
-            col_sql = (
-                f"SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE, CHARACTER_MAXIMUM_LENGTH, "
-                f"NUMERIC_PRECISION, NUMERIC_SCALE, COLUMN_DEFAULT "
-                f"FROM \"{selected_db}\".INFORMATION_SCHEMA.COLUMNS "
-                f"WHERE TABLE_SCHEMA = '{selected_schema}' AND TABLE_NAME = '{selected_table}' "
-                f"ORDER BY ORDINAL_POSITION"
-            )
-            col_df, _, col_err = _snowflake_query(conn, col_sql, secret)
-            if col_df is not None and not col_df.empty:
-                st.dataframe(col_df, use_container_width=True, hide_index=True)
+            col_src, col_err = _columns_for_schema(identity, selected_db, selected_schema, secret)
+            col_tbl = None
+            if col_src is not None:
+                col_tbl = _catalog_select(
+                    col_src,
+                    "SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE, CHARACTER_MAXIMUM_LENGTH, "
+                    "NUMERIC_PRECISION, NUMERIC_SCALE, COLUMN_DEFAULT "
+                    "FROM _sf_catalog WHERE KIND = 'columns' AND SCHEMA_NAME = ? AND TABLE_NAME = ? "
+                    "ORDER BY ORDINAL_POSITION",
+                    [selected_schema, selected_table],
+                )
+            if col_tbl is not None and col_tbl.num_rows:
+                st.dataframe(col_tbl, use_container_width=True, hide_index=True)
             else:
                 st.caption(f"Could not retrieve metadata. {col_err}")
 
-            cnt_sql = f"SELECT COUNT(*) AS ROW_COUNT FROM \"{selected_db}\".\"{selected_schema}\".\"{selected_table}\""
-            cnt_df, _, _ = _snowflake_query(conn, cnt_sql, secret)
-            if cnt_df is not None and not cnt_df.empty:
-                st.metric("Row Count", f"{int(cnt_df.iloc[0, 0]):,}")
+            # Row count / size come free with the catalog metadata
+            stats = None
+            if catalog is not None:
+                stats = _catalog_select(
+                    catalog,
+                    "SELECT ROW_COUNT, BYTES FROM _sf_catalog "
+                    "WHERE KIND = 'tables' AND SCHEMA_NAME = ? AND TABLE_NAME = ?",
+                    [selected_schema, selected_table],
+                ).to_pylist()
+            if stats and stats[0]["ROW_COUNT"] is not None:
+                rc_col, size_col = st.columns(2)
+                rc_col.metric("Row Count", f"{int(stats[0]['ROW_COUNT']):,}")
+                if stats[0]["BYTES"] is not None:
+                    size_col.metric("Size", f"{int(stats[0]['BYTES']) / 1024 ** 2:,.1f} MB")
+            else:
+                st.caption("No row count in metadata (view, external or Iceberg table).")
+                if st.button("🔢 Count rows", key="count_rows", help="Runs SELECT COUNT(*) on the warehouse"):
+                    row_count = _cached_row_count(identity, selected_db, selected_schema, selected_table, secret)
+                    if row_count is not None:
+                        st.metric("Row Count", f"{row_count:,}")
 
         with preview_col:
-            st.markdown(
-                '<div class="table-header">🔍 Data Preview  (via DuckDB snowflake_query)</div>',
-                unsafe_allow_html=True,
-            )
-            preview_limit = st.slider("Preview rows", 10, 1000, 100, step=10, key="preview_limit")
-            preview_sf_sql = (
-                f"SELECT * FROM \"{selected_db}\".\"{selected_schema}\".\"{selected_table}\" "
-                f"LIMIT {preview_limit}"
-            )
-
-            if st.button("🔄 Load Preview", key="load_preview"):
-                with st.spinner("Fetching via DuckDB → Arrow ADBC…"):
-                    df, elapsed, err = _snowflake_query(conn, preview_sf_sql, secret)
-                if err:
-                    st.error(err)
-                elif df is not None:
-                    st.caption(f"{len(df)} rows  •  {elapsed:.2f}s  •  DuckDB compute")
-                    st.dataframe(df, use_container_width=True, hide_index=True)
-
-            with st.expander("📋 DuckDB SQL for this table"):
-                passthrough = (
-                    f"SELECT * FROM snowflake_query(\n"
-                    f"    'SELECT * FROM \"{selected_db}\".\"{selected_schema}\".\"{selected_table}\" LIMIT {preview_limit}',\n"
-                    f"    '{secret}'\n);"
-                )
-                st.code(passthrough, language="sql")
+            _preview_fragment(conn, secret, selected_db, selected_schema, selected_table)
     elif selected_db:
         st.caption("Select a schema and table to preview data and column metadata.")
 
 
+with tab_browser:
+    _browser_fragment(conn, secret)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # TAB 2 – Snowflake passthrough query  (snowflake_query)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_query:
+@st.fragment
+def _query_fragment(conn: duckdb.DuckDBPyConnection, secret: str) -> None:
+    """Snowflake passthrough query editor and results."""
     st.markdown("### Snowflake SQL  *(passthrough via `snowflake_query()`)*")
     st.caption(
         "Your SQL is sent to Snowflake; results stream back through Arrow ADBC "
@@ -518,20 +1053,10 @@ with tab_query:
 
     # Quick helpers
     hc = st.columns(4)
-    table_ref = (
-        f'"{st.session_state.current_db}"."{st.session_state.current_schema}"."{st.session_state.current_table}"'
-        if st.session_state.current_table
-        else '"DB"."SCHEMA"."TABLE"'
+    helpers = _sf_helper_snippets(
+        st.session_state.current_db, st.session_state.current_schema, st.session_state.current_table
     )
-    helpers = {
-        "SHOW WAREHOUSES": "SHOW WAREHOUSES",
-        "SHOW DATABASES": "SHOW DATABASES",
-        "Session Info": "SELECT CURRENT_USER() AS U, CURRENT_ROLE() AS R, "
-                        "CURRENT_WAREHOUSE() AS WH, CURRENT_DATABASE() AS DB, "
-                        "CURRENT_SCHEMA() AS SCHEMA",
-        "Table Sample": f"SELECT * FROM {table_ref} LIMIT 100",
-    }
-    for idx, (lbl, snip) in enumerate(helpers.items()):
+    for idx, (lbl, snip) in enumerate(helpers):
         with hc[idx]:
             if st.button(lbl, key=f"sf_helper_{idx}", use_container_width=True):
                 st.session_state["sf_sql_input"] = snip
@@ -558,72 +1083,74 @@ with tab_query:
 
     if sf_query:
         with st.spinner("Executing via DuckDB → snowflake_query()…"):
-            df, elapsed, err = _snowflake_query(conn, sf_query, secret)
+            tbl, elapsed, err = _snowflake_query(conn, sf_query, secret)
         if err:
             st.error(f"**Query Error**\n\n```\n{err}\n```")
-        elif df is not None:
-            st.session_state.last_result = df
+        elif tbl is not None:
+            st.session_state.last_result = tbl
             st.session_state.last_query = sf_query
+            st.session_state.last_result_key = uuid.uuid4().hex
+            # Expose the result to the DuckDB Local SQL tab
+            conn.register("last_sf_result", tbl)
             st.session_state.last_elapsed = elapsed
-            st.session_state.last_row_count = len(df)
-            st.session_state.query_history.insert(0, {
+            st.session_state.last_row_count = tbl.num_rows
+            st.session_state["sf_page"] = 1
+            st.session_state.query_history.appendleft({
                 "sql": sf_query, "mode": "snowflake_query",
-                "rows": len(df), "time": f"{elapsed:.2f}s",
+                "rows": tbl.num_rows, "time": f"{elapsed:.2f}s",
                 "ts": time.strftime("%H:%M:%S"),
             })
-            st.session_state.query_history = st.session_state.query_history[:50]
 
     # Results
-    if st.session_state.last_result is not None and not st.session_state.last_result.empty:
-        df = st.session_state.last_result
+    if st.session_state.last_result is not None and st.session_state.last_result.num_rows:
+        tbl = st.session_state.last_result
+        result_key = st.session_state.last_result_key
         m1, m2, m3 = st.columns(3)
         m1.metric("Rows", f"{st.session_state.last_row_count:,}")
-        m2.metric("Columns", str(len(df.columns)))
+        m2.metric("Columns", str(tbl.num_columns))
         m3.metric("Time", f"{st.session_state.last_elapsed:.2f}s")
-        st.dataframe(df, use_container_width=True, hide_index=True, height=420)
-
-        # Export
-        ec = st.columns(3)
-        with ec[0]:
-            st.download_button("⬇️ CSV", df.to_csv(index=False), "result.csv", "text/csv", use_container_width=True)
-        with ec[1]:
-            st.download_button("⬇️ JSON", df.to_json(orient="records", indent=2), "result.json", "application/json", use_container_width=True)
-        with ec[2]:
-            buf = io.BytesIO()
-            try:
-                df.to_parquet(buf, index=False)
-                st.download_button("⬇️ Parquet", buf.getvalue(), "result.parquet", "application/octet-stream", use_container_width=True)
-            except Exception:
-                st.button("Parquet N/A", disabled=True, use_container_width=True)
+        pc1, pc2 = st.columns([1, 4])
+        with pc1:
+            page = _page_input(tbl, "sf_page")
+        with pc2:
+            pandas_view = st.toggle("pandas view", key="sf_pandas_view",
+                                    help="Convert the result to a pandas DataFrame before rendering")
+        _show_page(tbl, page, pandas_view, height=420)
+
+        # Export – data is a callable, so serialization only happens on click
+        _export_buttons(result_key, tbl, "result", "sf_export")
+
+
+with tab_query:
+    _query_fragment(conn, secret)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TAB 3 – DuckDB local SQL (cross-database analytics, COPY TO, etc.)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-with tab_local:
+@st.fragment
+def _local_fragment(conn: duckdb.DuckDBPyConnection, secret: str) -> None:
+    """DuckDB local SQL editor and results."""
     st.markdown("### DuckDB Local SQL")
     st.caption(
         "Run any DuckDB SQL here – analytics on local tables, COPY TO exports, "
-        "cross-database joins between Snowflake and local data, etc."
+        "cross-database joins between Snowflake and local data, etc.  "
+        "The latest Snowflake Query result is available as `last_sf_result`."
     )
+    if st.session_state.attach_alias:
+        alias = st.session_state.attach_alias
+        st.caption(
+            f"The connection's default database is attached as `{alias}` – e.g. "
+            f"`SELECT * FROM {alias}.<schema>.<table> WHERE …`.  Filters are pushed "
+            f"down to Snowflake, LIMIT is not: use `snowflake_query()` for samples."
+        )
 
     lc = st.columns(5)
-    local_helpers = {
-        "DuckDB Version": "SELECT version() AS duckdb_version",
-        "List Secrets": "SELECT name, type, provider FROM duckdb_secrets() WHERE type = 'snowflake'",
-        "Local Tables": "SHOW ALL TABLES",
-        "Snowflake Ext": "SELECT snowflake_version()",
-        "SF → Local": (
-            f"CREATE OR REPLACE TABLE sample_data AS\n"
-            f"SELECT * FROM snowflake_query(\n"
-            f"    'SELECT * FROM {table_ref} LIMIT 500',\n"
-            f"    '{secret}'\n)"
-            if st.session_state.current_table
-            else "-- Select a table in Browser tab first"
-        ),
-    }
-    for idx, (lbl, snip) in enumerate(local_helpers.items()):
+    local_helpers = _local_helper_snippets(
+        st.session_state.current_db, st.session_state.current_schema, st.session_state.current_table, secret
+    )
+    for idx, (lbl, snip) in enumerate(local_helpers):
         with lc[idx]:
             if st.button(lbl, key=f"local_helper_{idx}", use_container_width=True):
                 st.session_state["local_sql_input"] = snip
@@ -660,45 +1187,69 @@ COPY local_customers TO '/tmp/customers.parquet' (FORMAT PARQUET);""",
     lrc = st.columns([1, 5])
     with lrc[0]:
         local_run = st.button("▶️ Run", type="primary", use_container_width=True, key="local_run_btn")
+    with lrc[1]:
+        local_pandas_view = st.toggle("pandas view", key="local_pandas_view",
+                                      help="Convert results to pandas DataFrames before rendering")
 
     if local_run and local_sql.strip():
-        # Support multiple statements separated by ;  (naive split, good enough for simple cases)
-        statements = [s.strip() for s in local_sql.strip().rstrip(";").split(";") if s.strip()]
-        for stmt in statements:
+        # Split with DuckDB's own parser so ';' inside string literals / comments is safe
+        try:
+            statements = [stmt.query.strip() for stmt in conn.extract_statements(local_sql)]
+        except Exception as exc:
+            st.error(f"```\n{exc}\n```")
+            statements = []
+        # One history entry per run: statement timings are summed, UI time excluded
+        run_stmts: list[str] = []
+        run_rows = 0
+        run_elapsed = 0.0
+        outcomes: list[dict] = []
+        for stmt_idx, stmt in enumerate(statements):
             with st.spinner(f"Executing: {stmt[:60]}…"):
-                df, elapsed, err = _run_query_duckdb(conn, stmt)
+                tbl, elapsed, err = _run_query_duckdb(conn, stmt)
             if err:
-                st.error(f"```\n{err}\n```")
-            elif df is not None:
-                st.session_state.query_history.insert(0, {
-                    "sql": stmt, "mode": "duckdb_local",
-                    "rows": len(df), "time": f"{elapsed:.2f}s",
-                    "ts": time.strftime("%H:%M:%S"),
-                })
-                st.session_state.query_history = st.session_state.query_history[:50]
-
-                if not df.empty:
-                    st.caption(f"{len(df)} rows  •  {elapsed:.2f}s  •  DuckDB local")
-                    st.dataframe(df, use_container_width=True, hide_index=True, height=400)
-                    # Export
-                    ec2 = st.columns(3)
-                    with ec2[0]:
-                        st.download_button("⬇️ CSV", df.to_csv(index=False), "local_result.csv", "text/csv",
-                                           use_container_width=True, key=f"lcsv_{stmt[:20]}")
-                    with ec2[1]:
-                        st.download_button("⬇️ JSON", df.to_json(orient="records", indent=2), "local_result.json",
-                                           "application/json", use_container_width=True, key=f"ljson_{stmt[:20]}")
-                    with ec2[2]:
-                        buf2 = io.BytesIO()
-                        try:
-                            df.to_parquet(buf2, index=False)
-                            st.download_button("⬇️ Parquet", buf2.getvalue(), "local_result.parquet",
-                                               "application/octet-stream", use_container_width=True,
-                                               key=f"lpq_{stmt[:20]}")
-                        except Exception:
-                            st.button("Parquet N/A", disabled=True, use_container_width=True, key=f"lpqna_{stmt[:20]}")
-                else:
-                    st.success(f"✅ Statement executed ({elapsed:.2f}s, {len(df)} rows)")
+                outcomes.append({"idx": stmt_idx, "tbl": None, "elapsed": 0.0, "err": err})
+            elif tbl is not None:
+                outcomes.append({"idx": stmt_idx, "tbl": tbl, "elapsed": elapsed, "err": ""})
+                run_stmts.append(stmt)
+                run_rows += tbl.num_rows
+                run_elapsed += elapsed
+        if run_stmts:
+            st.session_state.query_history.appendleft({
+                "sql": ";\n".join(run_stmts), "mode": "duckdb_local",
+                "rows": run_rows, "time": f"{run_elapsed:.2f}s",
+                "ts": time.strftime("%H:%M:%S"),
+            })
+        # Kept in session state so the pagers below survive reruns
+        st.session_state.local_run = {
+            "key": uuid.uuid4().hex, "outcomes": outcomes,
+            "statements": len(statements), "elapsed": run_elapsed,
+        }
+        for stmt_idx in range(len(statements)):
+            st.session_state[f"local_page_{stmt_idx}"] = 1
+
+    # Results of the last run
+    run = st.session_state.local_run
+    if run is not None:
+        for out in run["outcomes"]:
+            tbl, elapsed = out["tbl"], out["elapsed"]
+            if out["err"]:
+                st.error(f"```\n{out['err']}\n```")
+            elif tbl.num_rows:
+                st.caption(f"{tbl.num_rows:,} rows  •  {elapsed:.2f}s  •  DuckDB local")
+                pc = st.columns([1, 4])
+                with pc[0]:
+                    page = _page_input(tbl, f"local_page_{out['idx']}")
+                _show_page(tbl, page, local_pandas_view, height=400)
+                # Export – keyed by statement index, so identical statement prefixes can't clash
+                _export_buttons(f"{run['key']}:{out['idx']}", tbl, "local_result", f"local_export_{out['idx']}")
+            else:
+                st.success(f"✅ Statement executed ({elapsed:.2f}s, {tbl.num_rows} rows)")
+        if run["statements"] > 1:
+            st.caption(f"{run['statements']} statements  •  {run['elapsed']:.2f}s query time")
+
+
+with tab_local:
+    _local_fragment(conn, secret)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -723,5 +1274,5 @@ with tab_history:
                     st.rerun()
 
         if st.button("🗑️ Clear History"):
-            st.session_state.query_history = []
+            st.session_state.query_history.clear()
             st.rerun()